@@ -5,27 +5,42 @@ Uses multiple fast APIs for reliable real-time data
 Version: 3.0.0 - Complete & Fast
 """
 
+import bisect
+import itertools
 import json
+import operator
 import os
-import requests
+import queue
+import sys
+import threading
+from collections import defaultdict, deque, namedtuple
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from functools import cached_property, lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
 import time
 
-# Import required libraries with fallback handling
-try:
-    from forex_python.converter import CurrencyRates
-    FOREX_AVAILABLE = True
-except ImportError:
-    FOREX_AVAILABLE = False
-    print("Note: forex-python not available. Using fallback rates.")
+# requests, forex-python and currency-converter are imported lazily by
+# ExchangeRateService so cache hits never pay their import cost
 
+# orjson serializes much faster - stdlib json is used without it
 try:
-    from currency_converter import CurrencyConverter as LibCurrencyConverter
-    CONVERTER_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    CONVERTER_AVAILABLE = False
-    print("Note: currency-converter not available. Using fallback rates.")
+    ORJSON_AVAILABLE = False
+
+
+# NumPy only speeds up bulk calculations - pure Python is used without it.
+# It is imported on first use to keep ~100ms off startup.
+@lru_cache(maxsize=1)
+def _load_numpy():
+    """NumPy module, or None if not installed"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
 
 # Configuration and Constants
 class Config:
@@ -55,16 +70,34 @@ class Config:
     }
     
     # File names for data persistence
-    HISTORY_FILE = "conversion_history.json"
+    HISTORY_FILE = "conversion_history.jsonl"  # append-only, one entry per line
+    LEGACY_HISTORY_FILE = "conversion_history.json"
     RATES_CACHE_FILE = "rates_cache.json"
     
     # API settings
-    API_TIMEOUT = 3  # seconds
+    API_TIMEOUT = 3  # seconds to wait for a response
+    API_CONNECT_TIMEOUT = 1  # seconds to establish the connection
     CACHE_DURATION = 300  # 5 minutes
+    CACHE_MAX_AGE = 12 * CACHE_DURATION  # cached rates older than this are never reused
     
     # Display settings
     DECIMAL_PLACES = 4
     MAX_HISTORY_ENTRIES = 100
+    
+    # Conversion result, filled straight from the conversion record
+    RESULT_FORMAT = (
+        "\n--- CONVERSION RESULT ---\n"
+        f"Amount: {{amount:,.{DECIMAL_PLACES}f}} {{from_currency}}\n"
+        f"Exchange Rate: 1 {{from_currency}} = {{exchange_rate:,.{DECIMAL_PLACES}f}} {{to_currency}}\n"
+        f"Converted Amount: {{converted_amount:,.{DECIMAL_PLACES}f}} {{to_currency}}"
+    )
+
+
+# Supported currency codes, frozen once for fast membership tests
+_SUPPORTED = frozenset(Config.SUPPORTED_CURRENCIES)
+
+# Fields trend analysis reads from each history entry, fetched in one call
+_get_trend_fields = operator.attrgetter('from_currency', 'to_currency', 'exchange_rate')
 
 
 class DataManager:
@@ -75,30 +108,73 @@ class DataManager:
         """Load data from JSON file"""
         try:
             if os.path.exists(filename):
-                with open(filename, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    return data if isinstance(data, list) else []
+                with open(filename, 'rb') as file:
+                    raw = file.read()
+                data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+                return data if isinstance(data, list) else []
             return []
-        except (json.JSONDecodeError, IOError, FileNotFoundError):
+        except (ValueError, IOError, FileNotFoundError):
             return []
     
     @staticmethod
-    def save_json_file(filename: str, data: List) -> bool:
-        """Save data to JSON file"""
+    def encode_json_line(entry: Dict) -> bytes:
+        """Serialize one entry as a compact JSON line"""
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(entry) + b'\n'
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+    
+    @staticmethod
+    def load_json_lines(filename: str, limit: Optional[int] = None) -> Tuple[List, int]:
+        """Load the last `limit` entries of a JSON Lines file, plus its line count"""
+        entries = deque(maxlen=limit)
+        line_count = 0
         try:
-            with open(filename, 'w', encoding='utf-8') as file:
-                json.dump(data, file, indent=2, ensure_ascii=False)
+            if os.path.exists(filename):
+                loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+                with open(filename, 'rb') as file:
+                    for line in file:
+                        line_count += 1
+                        try:
+                            entry = loads(line)
+                        except ValueError:
+                            continue  # Skip corrupt lines
+                        if isinstance(entry, dict):
+                            entries.append(entry)
+        except IOError:
+            pass
+        return list(entries), line_count
+    
+    @staticmethod
+    def save_json_lines(filename: str, data: List) -> bool:
+        """Rewrite a JSON Lines file atomically (write temp file, then replace)"""
+        try:
+            temp_filename = filename + '.tmp'
+            with open(temp_filename, 'wb') as file:
+                file.write(b''.join(DataManager.encode_json_line(entry) for entry in data))
+            os.replace(temp_filename, filename)
             return True
         except IOError:
             return False
 
 
+def _build_cross_rates(rates: Dict[str, float]) -> Tuple[List[str], Dict[str, int], List[List[float]]]:
+    """Precompute the full cross-rate table: matrix[i][j] = rates[i] / rates[j]"""
+    codes = list(rates)
+    index = {code: i for i, code in enumerate(codes)}
+    np = _load_numpy()
+    if np is not None:
+        rates_arr = np.array([rates[code] for code in codes], dtype=float)
+        matrix = (rates_arr[:, None] / rates_arr[None, :]).tolist()
+    else:
+        matrix = [[rates[row] / rates[col] for col in codes] for row in codes]
+    return codes, index, matrix
+
+
 class ExchangeRateService:
     """Fast exchange rate service with multiple APIs and caching"""
     
     def __init__(self):
-        self.forex_rates = CurrencyRates() if FOREX_AVAILABLE else None
-        self.lib_converter = LibCurrencyConverter() if CONVERTER_AVAILABLE else None
+        self._cache_expiry = 0.0  # Epoch seconds after which cached rates are stale
         self.rates_cache = self._load_cache()
         
         # Fast free APIs for real-time rates
@@ -107,6 +183,11 @@ class ExchangeRateService:
             "https://api.fixer.io/latest?base=USD",
             "https://open.er-api.com/v6/latest/USD"
         ]
+        # Circuit breaker per endpoint: url -> (consecutive failures, skip until)
+        self._endpoint_state: Dict[str, Tuple[int, float]] = {}
+        
+        # Set on exit so no new API probes are started
+        self._closed = False
         
         # Updated fallback rates for immediate response
         self.fallback_rates = {
@@ -116,6 +197,60 @@ class ExchangeRateService:
             'KWD': 0.3015, 'BHD': 0.3770, 'QAR': 3.6400, 'NOK': 8.5200,
             'SEK': 8.7500, 'DKK': 6.3400, 'PLN': 3.9800, 'CZK': 21.5000
         }
+        # Fetch rates in the background while the user reads the menu
+        self._cache_lock = threading.Lock()
+        self._prefetch: Optional[threading.Thread] = None
+        if time.time() >= self._cache_expiry:
+            self._prefetch = threading.Thread(target=self._background_refresh, daemon=True)
+            self._prefetch.start()
+    
+    @cached_property
+    def _cross_rates(self) -> Tuple[List[str], Dict[str, int], List[List[float]]]:
+        """Fallback cross-rate table, built on first use so any pair is an index lookup"""
+        return _build_cross_rates(self.fallback_rates)
+    
+    @cached_property
+    def forex_rates(self):
+        """forex-python rate client, imported on first use"""
+        try:
+            from forex_python.converter import CurrencyRates
+        except ImportError:
+            print("Note: forex-python not available. Using fallback rates.")
+            return None
+        return CurrencyRates()
+    
+    @cached_property
+    def lib_converter(self):
+        """currency-converter (ECB data) client, imported on first use"""
+        try:
+            from currency_converter import CurrencyConverter as LibCurrencyConverter
+        except ImportError:
+            LibCurrencyConverter = None
+        # Without the library this script itself is importable as
+        # 'currency_converter', so make sure we got the real thing
+        if LibCurrencyConverter is None or not hasattr(LibCurrencyConverter, 'convert'):
+            print("Note: currency-converter not available. Using fallback rates.")
+            return None
+        return LibCurrencyConverter()
+    
+    @cached_property
+    def _session(self):
+        """Persistent HTTP session, or None if requests is not installed"""
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+        except ImportError:
+            return None
+        # Reuses TCP/TLS connections across refreshes; neither connect nor read
+        # timeouts are retried, so a dead or hung endpoint costs at most
+        # API_CONNECT_TIMEOUT + API_TIMEOUT
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(
+            pool_connections=4, pool_maxsize=4,
+            max_retries=Retry(total=2, connect=0, read=0, backoff_factor=0.1)
+        ))
+        return session
     
     def _load_cache(self) -> Dict:
         """Load cached rates"""
@@ -123,53 +258,159 @@ class ExchangeRateService:
             if os.path.exists(Config.RATES_CACHE_FILE):
                 with open(Config.RATES_CACHE_FILE, 'r') as f:
                     cache = json.load(f)
-                    # Check if cache is still valid
+                    # Work out once when the cache goes stale
                     if 'timestamp' in cache:
-                        cache_time = datetime.fromisoformat(cache['timestamp'])
-                        if datetime.now() - cache_time < timedelta(seconds=Config.CACHE_DURATION):
-                            return cache
+                        cache_time = datetime.fromisoformat(cache['timestamp']).timestamp()
+                        self._cache_expiry = cache_time + Config.CACHE_DURATION
+                        # Caches written before per-rate times share the cache time
+                        if 'rate_times' not in cache:
+                            cache['rate_times'] = dict.fromkeys(cache.get('rates', {}), cache_time)
+                        return cache
             return {}
         except:
             return {}
     
-    def _save_cache(self, rates: Dict) -> None:
-        """Save rates to cache"""
+    @staticmethod
+    def _should_replace(old_rates: Dict, new_rates: Dict) -> bool:
+        """Whether fresh rates cover every cached currency, so can replace them outright"""
+        return old_rates.keys() <= new_rates.keys()
+    
+    def _save_cache(self, rates: Dict) -> Dict:
+        """Save rates to cache, returning the rates now in effect"""
+        now = datetime.now()
+        fetched_at = now.timestamp()
+        rates = dict(rates)
+        rate_times = dict.fromkeys(rates, fetched_at)
+        
+        # A partial response must not shrink the cached set: currencies it lacks
+        # keep their cached rate - and its original fetch time - while recent enough
+        cached_rates = self.rates_cache.get('rates', {})
+        if not self._should_replace(cached_rates, rates):
+            cached_times = self.rates_cache.get('rate_times', {})
+            for code, rate in cached_rates.items():
+                rate_time = cached_times.get(code, 0.0)
+                if code not in rates and fetched_at - rate_time < Config.CACHE_MAX_AGE:
+                    rates[code] = rate
+                    rate_times[code] = rate_time
+        
+        cache_data = {
+            'rates': rates,
+            'rate_times': rate_times,
+            'timestamp': now.isoformat()
+        }
+        self.rates_cache = cache_data
+        self._cache_expiry = now.timestamp() + Config.CACHE_DURATION
         try:
-            cache_data = {
-                'rates': rates,
-                'timestamp': datetime.now().isoformat()
-            }
-            with open(Config.RATES_CACHE_FILE, 'w') as f:
-                json.dump(cache_data, f)
+            # Compact output - the cache is never read by humans
+            if ORJSON_AVAILABLE:
+                payload = orjson.dumps(cache_data)
+            else:
+                payload = json.dumps(cache_data, separators=(',', ':')).encode('utf-8')
+            with open(Config.RATES_CACHE_FILE, 'wb') as f:
+                f.write(payload)
         except:
             pass
+        return rates
+    
+    def _fetch_endpoint(self, session, api_url: str) -> Optional[Dict]:
+        """Fetch rates from a single API endpoint, tracking its health"""
+        try:
+            response = session.get(
+                api_url, timeout=(Config.API_CONNECT_TIMEOUT, Config.API_TIMEOUT)
+            )
+            if response.status_code == 200:
+                data = response.json()
+                if 'rates' in data:
+                    self._endpoint_state.pop(api_url, None)  # Close the circuit
+                    return data['rates']
+        except:
+            pass
+        
+        # Back off exponentially (capped at a minute) before trying it again
+        fail_count = self._endpoint_state.get(api_url, (0, 0.0))[0] + 1
+        self._endpoint_state[api_url] = (fail_count, time.time() + min(60, 2 ** fail_count))
+        return None
     
     def _fetch_rates_from_api(self) -> Optional[Dict]:
-        """Fetch rates from fast APIs"""
-        for api_url in self.api_endpoints:
-            try:
-                response = requests.get(api_url, timeout=Config.API_TIMEOUT)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'rates' in data:
-                        return data['rates']
-            except:
-                continue
+        """Fetch rates from fast APIs - all endpoints are probed in parallel"""
+        if self._closed:
+            return None
+        session = self._session
+        if session is None:
+            return None
+        
+        # Skip endpoints whose circuit is open after recent failures
+        now = time.time()
+        endpoints = [api_url for api_url in self.api_endpoints
+                     if now >= self._endpoint_state.get(api_url, (0, 0.0))[1]]
+        if not endpoints:
+            return None
+        
+        # One daemon thread per endpoint: a hung API can never hold up exit
+        results: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        for api_url in endpoints:
+            threading.Thread(target=self._probe_endpoint, daemon=True,
+                             args=(session, api_url, results)).start()
+        
+        # First endpoint to answer with rates wins; stragglers are ignored
+        for _ in endpoints:
+            rates = results.get()
+            if rates:
+                return rates
         return None
     
+    def _probe_endpoint(self, session, api_url: str, results: queue.Queue) -> None:
+        """Probe one endpoint and report its rates (or None) to the caller"""
+        results.put(self._fetch_endpoint(session, api_url))
+    
+    def _store_rates(self, rates: Dict) -> Dict[str, float]:
+        """Cache freshly fetched rates, returning the rates now in effect"""
+        # Filter to supported currencies only (walk the 20 codes, not every API rate)
+        filtered_rates = {k: rates[k] for k in _SUPPORTED if k in rates}
+        with self._cache_lock:
+            return self._save_cache(filtered_rates)
+    
+    def _background_refresh(self) -> None:
+        """Prefetch rates so the first conversion doesn't wait on the APIs"""
+        try:
+            rates = self._fetch_rates_from_api()
+        except RuntimeError:
+            return  # Threads can't start once the interpreter is shutting down
+        if rates:
+            self._store_rates(rates)
+    
+    def close(self) -> None:
+        """Stop starting API probes; in-flight ones are daemons and don't block exit"""
+        self._closed = True
+    
     def get_all_rates(self, base_currency: str = 'USD') -> Dict[str, float]:
         """Get all exchange rates for display"""
-        # Check cache first
-        if 'rates' in self.rates_cache and base_currency == 'USD':
-            return self.rates_cache['rates']
+        # Let a running prefetch finish rather than racing it with a second fetch
+        if self._prefetch is not None and self._prefetch.is_alive():
+            self._prefetch.join()
+        
+        # Check cache first (only while it is fresh)
+        with self._cache_lock:
+            if (base_currency == 'USD' and 'rates' in self.rates_cache
+                    and time.time() < self._cache_expiry):
+                return self.rates_cache['rates']
         
         # Try to fetch from API
         rates = self._fetch_rates_from_api()
         if rates:
-            # Filter to supported currencies only
-            filtered_rates = {k: v for k, v in rates.items() if k in Config.SUPPORTED_CURRENCIES}
-            self._save_cache(filtered_rates)
-            return filtered_rates
+            return self._store_rates(rates)
+        
+        # APIs unreachable: recently fetched rates beat the built-in table
+        if base_currency == 'USD':
+            with self._cache_lock:
+                now = time.time()
+                rate_times = self.rates_cache.get('rate_times', {})
+                recent_rates = {
+                    code: rate for code, rate in self.rates_cache.get('rates', {}).items()
+                    if now - rate_times.get(code, 0.0) < Config.CACHE_MAX_AGE
+                }
+            if recent_rates:
+                return recent_rates
         
         # Use fallback rates
         return self.fallback_rates.copy()
@@ -192,7 +433,7 @@ class ExchangeRateService:
         rate = None
         
         # Try forex-python with minimal timeout
-        if FOREX_AVAILABLE and self.forex_rates:
+        if self.forex_rates:
             try:
                 rate = self.forex_rates.get_rate(from_currency, to_currency)
                 if rate and rate > 0:
@@ -201,11 +442,9 @@ class ExchangeRateService:
                 pass
         
         # Try currency-converter library
-        if CONVERTER_AVAILABLE and self.lib_converter:
+        if self.lib_converter:
             try:
-                from currency_converter import CurrencyConverter as CC
-                cc = CC()
-                rate = cc.convert(1, from_currency, to_currency)
+                rate = self.lib_converter.convert(1, from_currency, to_currency)
                 if rate and rate > 0:
                     return float(rate)
             except:
@@ -216,110 +455,203 @@ class ExchangeRateService:
     
     def _get_fallback_rate(self, from_currency: str, to_currency: str) -> float:
         """Get rate using fallback data - guaranteed to work"""
-        try:
-            if from_currency in self.fallback_rates and to_currency in self.fallback_rates:
-                from_rate = self.fallback_rates[from_currency]
-                to_rate = self.fallback_rates[to_currency]
-                return to_rate / from_rate
-            return 1.0  # Default rate if currencies not found
-        except (KeyError, ZeroDivisionError):
-            return 1.0  # Safe default
+        _, index, matrix = self._cross_rates
+        if from_currency in index and to_currency in index:
+            return matrix[index[to_currency]][index[from_currency]]
+        return 1.0  # Default rate if currencies not found
+
+
+class Conversion(namedtuple('Conversion', [
+        'amount', 'from_currency', 'to_currency', 'exchange_rate',
+        'converted_amount', 'timestamp', 'readable_time', 'ts'])):
+    """A single history entry - compact tuple record, dict only on disk"""
+    __slots__ = ()
+    
+    @classmethod
+    def from_dict(cls, entry: Dict) -> 'Conversion':
+        """Build a record from a stored entry, tolerating missing fields"""
+        ts = entry.get('ts')
+        if ts is None:
+            # Entries written before 'ts' existed get it derived once here
+            try:
+                ts = datetime.fromisoformat(entry['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                ts = 0.0  # Bad data counts as very old
+        return cls(
+            amount=entry.get('amount', 0),
+            from_currency=entry.get('from_currency', 'N/A'),
+            to_currency=entry.get('to_currency', 'N/A'),
+            exchange_rate=entry.get('exchange_rate', 0),
+            converted_amount=entry.get('converted_amount', 0),
+            timestamp=entry.get('timestamp', ''),
+            readable_time=entry.get('readable_time', 'Unknown time'),
+            ts=ts
+        )
 
 
 class ConversionHistory:
     """Lightweight conversion history management with trend analysis"""
     
     def __init__(self):
-        self.history = DataManager.load_json_file(Config.HISTORY_FILE)
+        entries, line_count = DataManager.load_json_lines(
+            Config.HISTORY_FILE, Config.MAX_HISTORY_ENTRIES
+        )
+        
+        # One-time migration from the old whole-file JSON history
+        migrating = not line_count and os.path.exists(Config.LEGACY_HISTORY_FILE)
+        if migrating:
+            entries = DataManager.load_json_file(Config.LEGACY_HISTORY_FILE)
+            line_count = -1  # Force the rewrite below
+        
+        # Bounded deques drop the oldest entry on append, keeping the cap O(1)
+        self.history: Deque[Conversion] = deque(
+            (Conversion.from_dict(entry) for entry in entries if isinstance(entry, dict)),
+            maxlen=Config.MAX_HISTORY_ENTRIES
+        )
+        
+        # Epoch timestamps kept parallel to history (append-only, so sorted)
+        self._timestamps: Deque[float] = deque(
+            (conversion.ts for conversion in self.history),
+            maxlen=Config.MAX_HISTORY_ENTRIES
+        )
+        
+        # Compact on startup if the file holds more than we keep
+        if line_count != len(self.history):
+            saved = self._save_all()
+            # Retire the legacy file so it is not imported again after a clear
+            if migrating and saved:
+                try:
+                    os.replace(Config.LEGACY_HISTORY_FILE,
+                               Config.LEGACY_HISTORY_FILE + '.migrated')
+                except OSError:
+                    pass
+        self._line_count = len(self.history)
+        self._fp = open(Config.HISTORY_FILE, 'ab', buffering=0)
+        # Conversions are saved from a background thread
+        self._lock = threading.Lock()
     
-    def add_conversion(self, conversion_data: Dict) -> None:
+    def _save_all(self) -> bool:
+        """Rewrite the history file from memory, converting records to dicts"""
+        return DataManager.save_json_lines(
+            Config.HISTORY_FILE, [conversion._asdict() for conversion in self.history]
+        )
+    
+    def add_conversion(self, conversion_data: Dict) -> bool:
         """Add a new conversion to history"""
         try:
-            # Add timestamp information
-            now = datetime.now()
-            conversion_data.update({
-                'timestamp': now.isoformat(),
-                'readable_time': now.strftime("%Y-%m-%d %H:%M:%S")
-            })
-            
-            # Add to history
-            self.history.append(conversion_data)
-            
-            # Maintain size limit
-            if len(self.history) > Config.MAX_HISTORY_ENTRIES:
-                self.history = self.history[-Config.MAX_HISTORY_ENTRIES:]
-            
-            # Save to file
-            DataManager.save_json_file(Config.HISTORY_FILE, self.history)
+            with self._lock:
+                # Stamp under the lock so history stays in time order
+                now = datetime.now()
+                conversion = Conversion(
+                    **conversion_data,
+                    timestamp=now.isoformat(),
+                    readable_time=now.strftime("%Y-%m-%d %H:%M:%S"),
+                    ts=now.timestamp()
+                )
+                
+                # Add to history
+                self.history.append(conversion)
+                self._timestamps.append(conversion.ts)
+                
+                # Append a single line; compact once the file grows well past the cap
+                self._fp.write(DataManager.encode_json_line(conversion._asdict()))
+                self._line_count += 1
+                if self._line_count > 2 * Config.MAX_HISTORY_ENTRIES:
+                    self._compact()
+            return True
             
         except Exception as e:
             print(f"Error saving conversion: {e}")
+            return False
+    
+    def _compact(self) -> bool:
+        """Rewrite the history file with only the entries kept in memory"""
+        self._fp.close()
+        saved = self._save_all()
+        self._fp = open(Config.HISTORY_FILE, 'ab', buffering=0)
+        if saved:
+            self._line_count = len(self.history)
+        return saved
     
-    def get_recent_history(self, limit: int = 10) -> List[Dict]:
-        """Get recent conversion history"""
-        return self.history[-limit:] if self.history else []
+    def close(self) -> None:
+        """Close the history file"""
+        with self._lock:
+            self._fp.close()
+    
+    def get_recent_history(self, limit: int = 10) -> List[Conversion]:
+        """Get recent conversion history, newest first"""
+        with self._lock:
+            return list(itertools.islice(reversed(self.history), limit))
     
     def clear_history(self) -> bool:
         """Clear all conversion history"""
-        self.history = []
-        return DataManager.save_json_file(Config.HISTORY_FILE, self.history)
+        with self._lock:
+            # Nothing left to serialize - just truncate the append-only file,
+            # and only forget the entries once that has succeeded
+            try:
+                self._fp.truncate(0)
+            except OSError:
+                return False
+            self.history.clear()
+            self._timestamps.clear()
+            self._line_count = 0
+            return True
     
     def get_currency_trends(self, days: int = 7) -> Dict[str, Dict]:
         """Analyze currency trends from conversion history"""
         if not self.history:
             return {}
         
-        # Get conversions from last N days
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_conversions = []
-        
-        for conversion in self.history:
-            try:
-                conv_time = datetime.fromisoformat(conversion['timestamp'])
-                if conv_time >= cutoff_date:
-                    recent_conversions.append(conversion)
-            except:
-                continue
+        # Get conversions from last N days - history is in time order
+        cutoff_ts = (datetime.now() - timedelta(days=days)).timestamp()
+        with self._lock:
+            start = bisect.bisect_left(self._timestamps, cutoff_ts)
+            recent_conversions = list(itertools.islice(self.history, start, None))
         
         if len(recent_conversions) < 2:
             return {}
         
         # Analyze trends by currency pairs
-        currency_rates = {}
+        currency_rates = defaultdict(list)
         for conversion in recent_conversions:
-            pair = f"{conversion['from_currency']}/{conversion['to_currency']}"
-            rate = conversion['exchange_rate']
-            timestamp = conversion['timestamp']
-            
-            if pair not in currency_rates:
-                currency_rates[pair] = []
-            currency_rates[pair].append({'rate': rate, 'time': timestamp})
+            from_currency, to_currency, rate = _get_trend_fields(conversion)
+            currency_rates[f"{from_currency}/{to_currency}"].append(rate)
+        
+        # Oldest/newest rate per pair (entries are already in time order);
+        # a zero oldest rate (missing data) has no meaningful change
+        pairs = [pair for pair, rates in currency_rates.items()
+                 if len(rates) >= 2 and rates[0]]
+        if not pairs:
+            return {}
+        oldest_rates = [currency_rates[pair][0] for pair in pairs]
+        newest_rates = [currency_rates[pair][-1] for pair in pairs]
+        
+        # Calculate percentage change and direction for all pairs at once
+        np = _load_numpy()
+        if np is not None:
+            oldest = np.array(oldest_rates, dtype=float)
+            newest = np.array(newest_rates, dtype=float)
+            change_percents = (newest - oldest) / oldest * 100
+            directions = np.where(change_percents > 1, "rising",
+                                  np.where(change_percents < -1, "falling", "stable"))
+            change_percents = change_percents.tolist()
+            directions = directions.tolist()
+        else:
+            change_percents = [(new - old) / old * 100
+                               for old, new in zip(oldest_rates, newest_rates)]
+            directions = ["rising" if change > 1 else "falling" if change < -1 else "stable"
+                          for change in change_percents]
         
-        # Calculate trends
         trends = {}
-        for pair, rates in currency_rates.items():
-            if len(rates) >= 2:
-                # Sort by time
-                rates.sort(key=lambda x: x['time'])
-                oldest_rate = rates[0]['rate']
-                newest_rate = rates[-1]['rate']
-                
-                # Calculate percentage change
-                change_percent = ((newest_rate - oldest_rate) / oldest_rate) * 100
-                
-                trend_direction = "stable"
-                if change_percent > 1:
-                    trend_direction = "rising"
-                elif change_percent < -1:
-                    trend_direction = "falling"
-                
-                trends[pair] = {
-                    'change_percent': round(change_percent, 2),
-                    'direction': trend_direction,
-                    'oldest_rate': oldest_rate,
-                    'newest_rate': newest_rate,
-                    'data_points': len(rates)
-                }
+        for pair, change_percent, direction, oldest_rate, newest_rate in zip(
+                pairs, change_percents, directions, oldest_rates, newest_rates):
+            trends[pair] = {
+                'change_percent': round(change_percent, 2),
+                'direction': direction,
+                'oldest_rate': oldest_rate,
+                'newest_rate': newest_rate,
+                'data_points': len(currency_rates[pair])
+            }
         
         return trends
 
@@ -330,11 +662,44 @@ class CurrencyConverter:
     def __init__(self):
         self.exchange_service = ExchangeRateService()
         self.history = ConversionHistory()
+        
+        # Conversions are saved by a single writer thread, in order
+        self._save_queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._history_writer, daemon=True)
+        self._writer.start()
         print("Complete Currency Converter v3.0.0 - Fast & Complete")
         print("=" * 50)
     
+    def _history_writer(self):
+        """Write queued conversions to history until told to stop"""
+        while True:
+            conversion_data = self._save_queue.get()
+            try:
+                if conversion_data is None:
+                    return
+                if self.history.add_conversion(conversion_data):
+                    print("✓ Conversion saved to history")
+            finally:
+                self._save_queue.task_done()
+    
+    def _shutdown(self):
+        """Finish pending history writes, close files and stop API probing"""
+        if self._writer.is_alive():
+            self._save_queue.put(None)
+            self._writer.join()
+        self.history.close()
+        self.exchange_service.close()
+    
     def run(self):
         """Main application loop"""
+        try:
+            self._run_loop()
+        finally:
+            # Every way out (menu exit, Ctrl-C, errors) flushes history
+            self._shutdown()
+    
+    def _run_loop(self):
+        """Menu loop - returns when the user exits"""
         while True:
             try:
                 self.display_menu()
@@ -356,6 +721,8 @@ class CurrencyConverter:
                 else:
                     print("Invalid choice. Please select 1-6.")
                 
+                # Let the save confirmation print before the prompt
+                self._save_queue.join()
                 input("\nPress Enter to continue...")
                 
             except KeyboardInterrupt:
@@ -406,24 +773,19 @@ class CurrencyConverter:
             # Perform conversion (fast)
             print("Converting... (using live rates)")
             exchange_rate = self.exchange_service.get_exchange_rate(from_currency, to_currency)
-            converted_amount = amount * exchange_rate
-            
-            # Display result
-            print(f"\n--- CONVERSION RESULT ---")
-            print(f"Amount: {amount:,.{Config.DECIMAL_PLACES}f} {from_currency}")
-            print(f"Exchange Rate: 1 {from_currency} = {exchange_rate:,.{Config.DECIMAL_PLACES}f} {to_currency}")
-            print(f"Converted Amount: {converted_amount:,.{Config.DECIMAL_PLACES}f} {to_currency}")
             
-            # Save to history
+            # Build the record once; it feeds both the display and history
             conversion_data = {
                 'amount': amount,
                 'from_currency': from_currency,
                 'to_currency': to_currency,
                 'exchange_rate': exchange_rate,
-                'converted_amount': converted_amount
+                'converted_amount': amount * exchange_rate
             }
-            self.history.add_conversion(conversion_data)
-            print("✓ Conversion saved to history")
+            print(Config.RESULT_FORMAT.format_map(conversion_data))
+            
+            # Result is already shown; the writer saves it and confirms
+            self._save_queue.put(conversion_data)
             
         except Exception as e:
             print(f"Conversion failed: {e}")
@@ -436,7 +798,7 @@ class CurrencyConverter:
             print("Currency cannot be empty.")
             return None
         
-        if currency not in Config.SUPPORTED_CURRENCIES:
+        if currency not in _SUPPORTED:
             print(f"Currency '{currency}' is not supported.")
             print("Use option 3 to see available currencies.")
             return None
@@ -456,17 +818,14 @@ class CurrencyConverter:
         print(f"Showing last {len(history)} conversions:")
         print("-" * 80)
         
-        for i, conversion in enumerate(reversed(history), 1):
-            amount = conversion.get('amount', 0)
-            from_curr = conversion.get('from_currency', 'N/A')
-            to_curr = conversion.get('to_currency', 'N/A')
-            rate = conversion.get('exchange_rate', 0)
-            converted = conversion.get('converted_amount', 0)
-            time_str = conversion.get('readable_time', 'Unknown time')
-            
-            print(f"{i:2d}. {amount:,.2f} {from_curr} → {converted:,.2f} {to_curr}")
-            print(f"    Rate: {rate:,.4f} | Time: {time_str}")
-            print()
+        # Build the whole listing and write it in one go
+        entries = [
+            f"{i:2d}. {conversion.amount:,.2f} {conversion.from_currency}"
+            f" → {conversion.converted_amount:,.2f} {conversion.to_currency}\n"
+            f"    Rate: {conversion.exchange_rate:,.4f} | Time: {conversion.readable_time}\n\n"
+            for i, conversion in enumerate(history, 1)
+        ]
+        sys.stdout.write("".join(entries))
         
         # Option to clear history
         clear_choice = input("Clear history? (y/N): ").strip().lower()
@@ -494,10 +853,14 @@ class CurrencyConverter:
                 # Sort by currency code for better display
                 sorted_rates = sorted(rates.items())
                 
-                for i, (currency, rate) in enumerate(sorted_rates, 1):
-                    if currency != 'USD':  # Skip USD since it's the base
-                        currency_name = Config.SUPPORTED_CURRENCIES.get(currency, currency)
-                        print(f"{i:2d}. 1 USD = {rate:,.{Config.DECIMAL_PLACES}f} {currency} ({currency_name})")
+                # Build all lines first and write them in one go (USD is the base, so skipped)
+                lines = [
+                    f"{i:2d}. 1 USD = {rate:,.{Config.DECIMAL_PLACES}f} {currency}"
+                    f" ({Config.SUPPORTED_CURRENCIES.get(currency, currency)})\n"
+                    for i, (currency, rate) in enumerate(sorted_rates, 1)
+                    if currency != 'USD'
+                ]
+                sys.stdout.write("".join(lines))
                 
                 print("-" * 60)
                 print(f"Rates are cached for {Config.CACHE_DURATION//60} minutes for fast access")
@@ -550,9 +913,11 @@ class CurrencyConverter:
         print(f"Total currencies supported: {len(Config.SUPPORTED_CURRENCIES)}")
         print("-" * 60)
         
-        # Display in organized format
-        for i, (code, name) in enumerate(Config.SUPPORTED_CURRENCIES.items(), 1):
-            print(f"{i:2d}. {code:3s} - {name}")
+        # Display in organized format, written in one go
+        sys.stdout.write("".join(
+            f"{i:2d}. {code:3s} - {name}\n"
+            for i, (code, name) in enumerate(Config.SUPPORTED_CURRENCIES.items(), 1)
+        ))
         
         print("-" * 60)
         print("You can use any of these currency codes for conversion.")
@@ -561,6 +926,7 @@ class CurrencyConverter:
         """Clean exit from application"""
         print("\n--- EXITING CURRENCY CONVERTER ---")
         print("Thank you for using Complete Currency Converter!")
+        self._shutdown()
         print("All conversion history has been saved.")
         print("Goodbye!")
 
@@ -0,0 +1,136 @@
+"""
+Unit tests for the currency converter's rate cache policy
+Run with: python -m unittest test_currency_converter
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from currency_converter import Config, ExchangeRateService
+
+
+class RateCacheTestCase(unittest.TestCase):
+    """Base case: service with an isolated cache file and no network access"""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+
+        cache_file = mock.patch.object(
+            Config, 'RATES_CACHE_FILE', os.path.join(temp_dir.name, 'rates_cache.json')
+        )
+        cache_file.start()
+        self.addCleanup(cache_file.stop)
+
+        # Keep the startup prefetch (and any refresh) off the network
+        fetch = mock.patch.object(ExchangeRateService, '_fetch_rates_from_api', return_value=None)
+        self.fetch = fetch.start()
+        self.addCleanup(fetch.stop)
+
+        self.service = ExchangeRateService()
+        if self.service._prefetch is not None:
+            self.service._prefetch.join()
+
+    def set_cache(self, rates, age):
+        """Seed the in-memory cache with rates fetched `age` seconds ago"""
+        fetched_at = time.time() - age
+        self.service.rates_cache = {
+            'rates': dict(rates),
+            'rate_times': dict.fromkeys(rates, fetched_at),
+            'timestamp': datetime.fromtimestamp(fetched_at).isoformat()
+        }
+        self.service._cache_expiry = fetched_at + Config.CACHE_DURATION
+        return fetched_at
+
+
+class ShouldReplaceTests(unittest.TestCase):
+    """Replacement is decided by currency coverage, not by count"""
+
+    def test_superset_replaces(self):
+        old = {'USD': 1.0, 'EUR': 0.9}
+        new = {'USD': 1.0, 'EUR': 0.8, 'GBP': 0.7}
+        self.assertTrue(ExchangeRateService._should_replace(old, new))
+
+    def test_same_currencies_replace(self):
+        old = {'USD': 1.0, 'EUR': 0.9}
+        self.assertTrue(ExchangeRateService._should_replace(old, {'USD': 1.0, 'EUR': 0.8}))
+
+    def test_missing_currency_does_not_replace_even_with_equal_count(self):
+        old = {'USD': 1.0, 'EUR': 0.9, 'JPY': 150.0}
+        new = {'USD': 1.0, 'EUR': 0.8, 'GBP': 0.7}
+        self.assertFalse(ExchangeRateService._should_replace(old, new))
+
+    def test_smaller_response_does_not_replace(self):
+        old = {'USD': 1.0, 'EUR': 0.9, 'JPY': 150.0}
+        self.assertFalse(ExchangeRateService._should_replace(old, {'USD': 1.0, 'EUR': 0.8}))
+
+
+class SaveCacheTests(RateCacheTestCase):
+    """Merge-versus-replace behaviour of _save_cache"""
+
+    def test_fresh_cache_fills_gaps_keeping_original_fetch_time(self):
+        fetched_at = self.set_cache({'USD': 1.0, 'EUR': 0.9, 'JPY': 150.0}, age=60)
+
+        rates = self.service._save_cache({'USD': 1.0, 'EUR': 0.8})
+
+        self.assertEqual(rates, {'USD': 1.0, 'EUR': 0.8, 'JPY': 150.0})
+        rate_times = self.service.rates_cache['rate_times']
+        self.assertEqual(rate_times['JPY'], fetched_at)
+        self.assertGreater(rate_times['EUR'], fetched_at)
+
+    def test_stale_cache_is_replaced(self):
+        self.set_cache({'USD': 1.0, 'EUR': 0.9, 'JPY': 100.0}, age=Config.CACHE_MAX_AGE + 1)
+
+        rates = self.service._save_cache({'USD': 1.0, 'EUR': 0.8})
+
+        self.assertEqual(rates, {'USD': 1.0, 'EUR': 0.8})
+        self.assertNotIn('JPY', self.service.rates_cache['rate_times'])
+
+    def test_merged_rate_expires_at_its_own_age(self):
+        # JPY was carried over from an earlier fetch; its age is not reset
+        self.set_cache({'USD': 1.0, 'EUR': 0.9}, age=0)
+        self.service.rates_cache['rates']['JPY'] = 100.0
+        self.service.rates_cache['rate_times']['JPY'] = time.time() - Config.CACHE_MAX_AGE - 1
+
+        rates = self.service._save_cache({'USD': 1.0, 'EUR': 0.8})
+
+        self.assertNotIn('JPY', rates)
+
+    def test_covering_response_replaces_cache(self):
+        self.set_cache({'USD': 1.0, 'EUR': 0.9}, age=60)
+
+        rates = self.service._save_cache({'USD': 1.0, 'EUR': 0.8, 'GBP': 0.7})
+
+        self.assertEqual(rates, {'USD': 1.0, 'EUR': 0.8, 'GBP': 0.7})
+
+    def test_saved_cache_round_trips_through_file(self):
+        self.set_cache({'USD': 1.0, 'JPY': 150.0}, age=60)
+        self.service._save_cache({'USD': 1.0, 'EUR': 0.8})
+
+        loaded = self.service._load_cache()
+
+        self.assertEqual(loaded['rates'], {'USD': 1.0, 'EUR': 0.8, 'JPY': 150.0})
+        self.assertEqual(loaded['rate_times'], self.service.rates_cache['rate_times'])
+
+
+class GetAllRatesTests(RateCacheTestCase):
+    """What get_all_rates serves when the APIs cannot be reached"""
+
+    def test_expired_but_recent_cache_is_served_when_fetch_fails(self):
+        self.set_cache({'USD': 1.0, 'JPY': 150.0}, age=Config.CACHE_DURATION + 60)
+
+        self.assertEqual(self.service.get_all_rates(), {'USD': 1.0, 'JPY': 150.0})
+        self.fetch.assert_called()
+
+    def test_too_old_cache_falls_back_to_builtin_rates(self):
+        self.set_cache({'USD': 1.0, 'JPY': 150.0}, age=Config.CACHE_MAX_AGE + 1)
+
+        self.assertEqual(self.service.get_all_rates(), self.service.fallback_rates)
+
+
+if __name__ == '__main__':
+    unittest.main()